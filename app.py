@@ -3,8 +3,174 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-import re
-import itertools
+import plotly.io as pio
+from numba import njit
+
+# G-code constants
+LAYER_MARKER = ";-----------------------LAYER"
+# absolute E grows without bound and is differenced, so it stays float64
+AXIS_DTYPES = {**dict.fromkeys('XYZABC', np.float32), 'E': np.float64}
+
+# Parsing
+@njit(cache=True)
+def _scan_gcode(buf, marker):
+    """Byte-level G-code tokenizer: one pass over buf, modal axis state (G0/G1 words, G92 resets) into (6, n) float32 + float64 E + layer per G1 move."""
+    slot = np.full(128, -1, np.int64)
+    for k, c in enumerate((88, 89, 90, 65, 66, 67, 69)): slot[c] = k  # X Y Z A B C E
+    n = 1
+    for b in buf:
+        if b == 10 or b == 13: n += 1
+    vals = np.full((6, n), np.nan, np.float32); e = np.empty(n); layer = np.empty(n, np.int32)
+    cur = np.full(7, np.nan); seen = np.zeros(7, np.bool_)
+    t, markers, curr, start, size, ml = 0, 0, -1, 0, len(buf), len(marker)
+    while start <= size:
+        # find the line end and classify the line
+        end, mpos, is_g1, is_g0, is_g92 = start, -1, False, False, False
+        while end < size and buf[end] != 10 and buf[end] != 13:
+            c = buf[end]
+            if c == 71 and end+1 < size and 48 <= buf[end+1] <= 57:
+                q = end+1
+                while q < size and 48 <= buf[q] <= 57: q += 1
+                w = q-end-1  # G1, not G10/G11/G17
+                if w == 1 and buf[end+1] == 49: is_g1 = True
+                elif w == 1 and buf[end+1] == 48: is_g0 = True
+                elif w == 2 and buf[end+1] == 57 and buf[end+2] == 50: is_g92 = True
+            elif c == 59 and mpos < 0 and end+ml <= size:
+                hit = True
+                for q in range(1, ml):
+                    if buf[end+q] != marker[q]: hit = False; break
+                if hit: mpos = end
+            end += 1
+        if mpos >= 0:
+            # layer marker (+ optional whitespace-separated number)
+            markers += 1; j = mpos+ml
+            while j < end and (buf[j] == 32 or buf[j] == 9 or buf[j] == 11 or buf[j] == 12): j += 1
+            if j > mpos+ml and j < end and 48 <= buf[j] <= 57:
+                curr = 0
+                while j < end and 48 <= buf[j] <= 57: curr = curr*10 + (buf[j]-48); j += 1
+        if is_g1 or is_g0 or is_g92:
+            # axis words (first per axis) update the modal position; only G1 adds a row
+            i = start; seen[:] = False
+            while i < end:
+                k = slot[buf[i]] if buf[i] < 128 else -1
+                i += 1
+                if k < 0 or (i-2 >= start and 65 <= buf[i-2] <= 90): continue
+                j, neg, mant, nd, nf = i, False, 0.0, 0, 0
+                if j < end and (buf[j] == 45 or buf[j] == 43): neg = buf[j] == 45; j += 1
+                while j < end and 48 <= buf[j] <= 57: mant = mant*10 + (buf[j]-48); nd += 1; j += 1
+                if j+1 < end and buf[j] == 46 and 48 <= buf[j+1] <= 57:
+                    j += 1
+                    while j < end and 48 <= buf[j] <= 57: mant = mant*10 + (buf[j]-48); nf += 1; j += 1
+                if nd+nf == 0: continue
+                if not seen[k]: cur[k] = -mant/10.0**nf if neg else mant/10.0**nf; seen[k] = True
+                i = j
+            if is_g92 and not seen.any(): cur[:] = 0.0  # bare G92 zeroes every axis
+        if is_g1:
+            vals[:, t] = cur[:6]; e[t] = cur[6]; layer[t] = curr; t += 1
+        start = end+1
+    return vals[:, :t], e[:t], layer[:t], markers
+
+@njit(cache=True)
+def _rdp_keep(coords, tol):
+    """Iterative Ramer-Douglas-Peucker over an (n, 3) path: mask of points to keep at tolerance tol."""
+    n = len(coords); keep = np.zeros(n, np.bool_)
+    if n == 0: return keep
+    keep[0] = keep[n-1] = True
+    stack = np.empty((n+1, 2), np.int64); stack[0, 0], stack[0, 1] = 0, n-1; top = 1
+    while top > 0:
+        top -= 1; s, e = stack[top, 0], stack[top, 1]
+        if e-s < 2: continue
+        bx, by, bz = coords[e, 0]-coords[s, 0], coords[e, 1]-coords[s, 1], coords[e, 2]-coords[s, 2]
+        l2 = bx*bx + by*by + bz*bz; dmax, idx = -1.0, s
+        for i in range(s+1, e):
+            px, py, pz = coords[i, 0]-coords[s, 0], coords[i, 1]-coords[s, 1], coords[i, 2]-coords[s, 2]
+            u = min(max((px*bx + py*by + pz*bz)/l2, 0.0), 1.0) if l2 > 0 else 0.0
+            dx, dy, dz = px-u*bx, py-u*by, pz-u*bz
+            d = dx*dx + dy*dy + dz*dz
+            if d > dmax: dmax, idx = d, i
+        if dmax > tol*tol:
+            keep[idx] = True
+            stack[top, 0], stack[top, 1] = s, idx; stack[top+1, 0], stack[top+1, 1] = idx, e; top += 2
+    return keep
+
+@st.cache_data(show_spinner=False)
+def parse_gcode(raw: bytes):
+    vals, e, layer, markers = _scan_gcode(np.frombuffer(raw, np.uint8), np.frombuffer(LAYER_MARKER.encode(), np.uint8))
+    df = pd.DataFrame(vals.T, columns=list('XYZABC')); df['E'] = e
+    return toolpath_frame(df, layer), markers
+
+def toolpath_frame(df, layer):
+    df.insert(0, 'Time Step', np.arange(len(df), dtype=np.int32))
+    df['Layer'] = pd.Categorical(layer, categories=np.unique(layer), ordered=True)
+    codes = df['Layer'].cat.codes.to_numpy(); df.attrs['layers_ascending'] = bool((codes[1:] >= codes[:-1]).all())
+    return enrich(df)
+
+def demo_frame(xyz):
+    # generated (n, 3) path in the parsed layout, single layer -1
+    df = pd.DataFrame(xyz.astype(np.float32), columns=['X','Y','Z']).reindex(columns=list('XYZABCE')).astype(AXIS_DTYPES)
+    return toolpath_frame(df, np.full(len(df), -1, np.int32))
+
+@st.cache_data(show_spinner=False)
+def fib_spiral(pts):
+    i = np.arange(pts); ang = np.deg2rad(137.5 * i); r = 0.02 * i
+    return demo_frame(np.column_stack([r*np.cos(ang), r*np.sin(ang), 0.01*i]))
+
+@st.cache_data(show_spinner=False)
+def dodecahedron():
+    phi = (1 + np.sqrt(5)) / 2; a = 1/phi
+    sg = np.array([1., -1.])
+    cube = np.stack(np.meshgrid(sg, sg, sg, indexing='ij'), -1).reshape(-1, 3)
+    x, y = (m.ravel() for m in np.meshgrid(sg, sg, indexing='ij')); o = np.zeros_like(x)
+    rings = np.stack([np.column_stack([o,x*a,y*phi]), np.column_stack([x*a,y*phi,o]), np.column_stack([x*phi,o,y*a])], axis=1).reshape(-1, 3)
+    return demo_frame(np.vstack([cube, rings]))
+
+def enrich(df):
+    xyz = df[['X','Y','Z']].to_numpy(np.float64); ok = ~np.isnan(xyz).any(1); coords = xyz[ok]
+    # step length between consecutive valid rows
+    diffs = coords[1:] - coords[:-1]; step = np.zeros(len(coords), np.float32); step[1:] = np.sqrt(np.einsum('ij,ij->i', diffs, diffs))
+    dist = np.full(len(df), np.nan, np.float32); dist[ok] = step; df['Distance'] = dist
+    # per-layer mean over all rows of the layer, even when it appears in several runs
+    d, codes = df['Distance'].to_numpy(np.float64), df['Layer'].cat.codes.to_numpy(); ok = ~np.isnan(d)
+    with np.errstate(invalid='ignore'): means = np.bincount(codes, weights=np.where(ok, d, 0)) / np.bincount(codes, weights=ok.astype(np.float64))
+    df['AvgLayerSpeed'] = means[codes].astype(np.float32)
+    return df
+
+@st.cache_data(show_spinner=False)
+def summary(df):
+    ulayers = df['Layer'].cat.categories.tolist()
+    # fmin/fmax skip NaN (unset axes)
+    xyz = df[['X','Y','Z']].to_numpy()
+    mn, mx = (np.fmin.reduce(xyz), np.fmax.reduce(xyz)) if len(xyz) else (np.full(3, np.nan),)*2
+    bbox = {ax: (mn[i], mx[i]) for i, ax in enumerate('XYZ')}
+    lengths = {ax: float(mx)-float(mn) for ax,(mn,mx) in bbox.items()}
+    vol = np.prod([lengths[ax]/1000 for ax in lengths])
+    return len(df), bbox, lengths, vol, ulayers
+
+@st.cache_data(show_spinner=False)
+def simplify(coords: np.ndarray, tol: float) -> np.ndarray: return _rdp_keep(np.ascontiguousarray(coords, dtype=np.float64), tol)
+
+def slice_layers(df, lo, hi):
+    cats, codes = df['Layer'].cat.categories, df['Layer'].cat.codes.to_numpy()
+    a, b = cats.searchsorted(lo), cats.searchsorted(hi,'right')
+    if a == 0 and b == len(cats): return df
+    # layers in order: the range is one contiguous run
+    if df.attrs.get('layers_ascending'): return df.iloc[codes.searchsorted(a):codes.searchsorted(b)]
+    return df.iloc[np.flatnonzero((codes>=a)&(codes<b))]
+
+def decimate(df, budget):
+    # stride down to ~budget rows, keeping the first/last row of each layer run
+    n = len(df); stride = -(-n // budget)
+    if stride <= 1: return df
+    codes = df['Layer'].cat.codes.to_numpy(); keep = np.zeros(n, bool); keep[::stride] = True
+    b = np.flatnonzero(np.diff(codes)); keep[b] = True; keep[b+1] = True; keep[[0,-1]] = True
+    return df[keep].reset_index(drop=True)
+
+# Export
+@st.cache_data(show_spinner=False, max_entries=2)
+def to_csv_bytes(df): return df.to_csv(index=False).encode()
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def to_parquet_bytes(df): return df.to_parquet(engine='pyarrow', compression='zstd', index=False)
 
 # Page config
 st.set_page_config(page_title="G-code Analyzer Dashboard", layout="wide")
@@ -32,50 +198,15 @@ if data_src == "Upload G-code/MPF":
     if not uploaded:
         st.info("Please upload a file or select a demo.")
         st.stop()
-    lines = uploaded.read().decode('utf-8').splitlines()
+    df, markers = parse_gcode(uploaded.getvalue())
 elif data_src == "Demo: Fibonacci Spiral":
     pts = st.sidebar.slider("Fibonacci points", 10, 1000, 200, key='fib')
-    lines = []
-    for i in range(pts):
-        ang = np.deg2rad(137.5 * i)
-        r = 0.02 * i
-        x, y, z = r*np.cos(ang), r*np.sin(ang), 0.01*i
-        lines.append(f"G1 X{x:.3f} Y{y:.3f} Z{z:.3f}")
+    df, markers = fib_spiral(pts), 0
 else:
-    phi = (1 + np.sqrt(5)) / 2; a = 1/phi
-    verts = []
-    for s in itertools.product([1,-1], repeat=3): verts.append(s)
-    for x,y in itertools.product([1,-1], repeat=2):
-        verts.extend([(0,x*a,y*phi),(x*a,y*phi,0),(x*phi,0,y*a)])
-    lines = [f"G1 X{v[0]:.3f} Y{v[1]:.3f} Z{v[2]:.3f}" for v in verts]
-
-# Parse into DataFrame
-cols = ['Time Step','X','Y','Z','A','B','C','E','Layer']
-data = {c: [] for c in cols}
-t, markers, curr = 0, 0, -1
-for ln in lines:
-    if ";-----------------------LAYER" in ln:
-        markers += 1
-        m = re.search(r"LAYER\s+(\d+)", ln)
-        if m: curr = int(m.group(1))
-    if "G1" in ln:
-        vals = {ax: None for ax in ['X','Y','Z','A','B','C','E']}
-        for ax in vals:
-            m = re.search(fr"{ax}([-+]?[0-9]*\.?[0-9]+)", ln)
-            if m: vals[ax] = float(m.group(1))
-        data['Time Step'].append(t)
-        data['Layer'].append(curr)
-        for ax in vals: data[ax].append(vals[ax])
-        t += 1
-
-df = pd.DataFrame(data)
+    df, markers = dodecahedron(), 0
 
 # Summary metrics
-steps = len(df)
-ulayers = sorted(df['Layer'].dropna().unique().astype(int))
-bbox = {ax: (df[ax].min(), df[ax].max()) for ax in ['X','Y','Z']}
-lengths = {ax: mx-mn for ax,(mn,mx) in bbox.items()}
-vol = np.prod([lengths[ax]/1000 for ax in lengths])
+steps, bbox, lengths, vol, ulayers = summary(df)
 
 # Sidebar summary
 st.sidebar.header("📐 Summary & Bounding Box")
@@ -88,16 +219,87 @@ st.sidebar.write(f"**Volume:** {vol:.6f} m³")
 
 # Helper
 def layer_ticks(minl, maxl): return {f"{i*10}%": int(minl + (maxl-minl)*i/10) for i in range(11)}
+def segments(a, b):
+    # segment endpoints separated by NaN breaks
+    out = np.full(3*len(a), np.nan); out[0::3] = a; out[1::3] = b; return out
+
+# Figures
+@st.cache_data(show_spinner=False, max_entries=4)
+def build_fig3d(df3, gtype, vmode, show_seams, show_ext, show_ss, anim):
+    # color map
+    if vmode=='Layer': color=df3['Layer']
+    elif vmode=='Extrusion Rate': color=np.nan_to_num(np.ediff1d(df3['E'].to_numpy(),to_begin=0.0))
+    elif vmode=='Distance': color=df3['Distance']
+    elif vmode=='Avg Layer Speed': color=df3['AvgLayerSpeed']
+    else:
+        k=df3['Layer'].cat.codes.to_numpy(); color=(np.bincount(k,weights=df3['Time Step'].to_numpy(np.float64))/np.maximum(np.bincount(k),1))[k]
+    color=np.asarray(color,dtype=np.float32)
+
+    # traces for the first n rows
+    xyz=np.asfortranarray(df3[['X','Y','Z']].to_numpy(np.float32)); X,Y,Z=xyz.T
+    uvw=np.diff(xyz,axis=0,prepend=xyz[:1]) if gtype=='Streamtube' else None
+    def make_traces(n):
+        if gtype=='Line': return [dict(type='scatter3d',x=X[:n],y=Y[:n],z=Z[:n],mode='lines',line=dict(color=color[:n],colorscale='Viridis',width=6))]
+        if gtype=='Scatter': return [dict(type='scatter3d',x=X[:n],y=Y[:n],z=Z[:n],mode='markers',marker=dict(color=color[:n],colorscale='Viridis',size=4,opacity=0.6))]
+        return [dict(type='streamtube',x=X[:n],y=Y[:n],z=Z[:n],u=uvw[:n,0],v=uvw[:n,1],w=uvw[:n,2],colorscale='Viridis',sizeref=0.5)]
+
+    # per-layer seam endpoints and Z extrema (row positions in df3)
+    def layer_stats(d):
+        g=d[['Layer','Z']].assign(pos=d.index).groupby('Layer',observed=True)
+        return g.agg(first=('pos','min'),last=('pos','max'),hi=('Z','idxmax'),lo=('Z','idxmin'))
+    stats=layer_stats(df3)
+
+    def overlay_traces(cut):
+        # only the layer(s) still being drawn at cut are recomputed
+        st_=stats[stats['first']<cut]; open_=(st_['last']>=cut).to_numpy()
+        if open_.any():
+            p=df3.iloc[st_.loc[open_,'first'].min():cut]; st_=pd.concat([st_[~open_],layer_stats(p[p['Layer'].isin(st_.index[open_])])])
+        traces=[]
+        if show_seams:
+            f,l=xyz[st_['first'].to_numpy(int)],xyz[st_['last'].to_numpy(int)]
+            traces.append(go.Scatter3d(x=segments(f[:,0],l[:,0]),y=segments(f[:,1],l[:,1]),z=segments(f[:,2],l[:,2]),mode='lines',connectgaps=False,line=dict(color='white',width=2),showlegend=False))
+        if show_ext:
+            hl=xyz[np.concatenate([st_['hi'].to_numpy(int),st_['lo'].to_numpy(int)])]
+            traces.append(go.Scatter3d(x=hl[:,0],y=hl[:,1],z=hl[:,2],mode='markers',marker=dict(color=['yellow']*len(st_)+['orange']*len(st_),size=4),showlegend=False))
+        if show_ss and cut>0:
+            ss=xyz[[0,cut-1]]; traces.append(go.Scatter3d(x=ss[:,0],y=ss[:,1],z=ss[:,2],mode='markers',marker=dict(color=['green','red'],size=6),showlegend=False))
+        return traces
+
+    # static or animated
+    if anim:
+        N=120; fd=int(10000/N); frames=[]; total=len(df3)
+        for i,frac in enumerate(np.linspace(1/N,1,N)):
+            cut=int(frac*total)
+            eye=dict(x=2*np.cos(2*np.pi*frac),y=2*np.sin(2*np.pi*frac),z=1)
+            traces=make_traces(cut)+overlay_traces(cut)
+            frames.append(go.Frame(data=traces,traces=list(range(len(traces))),name=f'f{i}',layout=dict(scene_camera=dict(eye=eye))))
+        fig=go.Figure(data=make_traces(total),frames=frames)
+        fig.update_layout(updatemenus=[dict(type='buttons',showactive=False,buttons=[dict(label='▶️ Play',method='animate',args=[None,dict(frame=dict(duration=fd,redraw=True),transition=dict(duration=0),fromcurrent=True)])])])
+    else:
+        fig=go.Figure(data=make_traces(len(df3))+overlay_traces(len(df3)))
+    fig.update_layout(scene=dict(xaxis_title='X (mm)',yaxis_title='Y (mm)',zaxis_title='Z (mm)',aspectmode='data'),template='plotly_dark',height=700,margin=dict(l=0,r=0,b=0,t=0),uirevision='toolpath')
+    return fig.to_dict()
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def fig3d_html(*args): return pio.to_html(build_fig3d(*args),include_plotlyjs='cdn',validate=False)
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def axes_fig(df_slice, axes, mode, height):
+    fig=px.line(decimate(df_slice[['Time Step','Layer',*axes]],100_000),x='Time Step',y=axes,template='plotly_dark',render_mode='webgl') if mode=='Raw' else px.line(df_slice.groupby('Layer',observed=True)[axes].mean().reset_index(),x='Layer',y=axes,template='plotly_dark',render_mode='webgl')
+    fig.update_layout(height=height,uirevision=mode)
+    return fig.to_dict()
 
 # 3D Toolpath Visualizer
 with st.expander("🌐 3D Toolpath Visualizer", expanded=True):
     c1,c2,c3,c4,c5 = st.columns([3,3,1,2,2])
     gtype = c1.selectbox("Graph Type:", ['Line','Scatter','Streamtube'], key='gtype')
-    vmode = c2.selectbox("Visualization Mode:", ['Layer','Extrusion Rate','Distance','Layer Time'], key='vmode')
+    vmode = c2.selectbox("Visualization Mode:", ['Layer','Extrusion Rate','Distance','Avg Layer Speed','Layer Time'], key='vmode')
     show_seams = c3.checkbox("Show Layer Seams", key='s1')
     show_ext = c3.checkbox("Show Layer High/Low", key='s2')
     show_ss   = c3.checkbox("Show Part Start/Stop", key='s3')
     samp = c4.slider("Simplify Every Nth Point", 1, 100, 1, key='samp')
+    tol = c4.slider("Simplification Tolerance (mm)", 0.0, 1.0, 0.0, 0.01, key='tol')
+    budget = c4.slider("Render point budget", 50_000, 1_000_000, 200_000, 50_000, key='budget')
     anim = c5.button("Animate 10s", key='anim')
 
     minl, maxl = ulayers[0] if ulayers else 0, ulayers[-1] if ulayers else 0
@@ -106,75 +308,33 @@ with st.expander("🌐 3D Toolpath Visualizer", expanded=True):
     cols = st.columns(len(ticks))
     for i,(lbl,val) in enumerate(ticks.items()): cols[i].caption(f"{lbl}\n{val}")
 
-    df_slice = df[(df['Layer']>=lr[0])&(df['Layer']<=lr[1])]
-    df3 = df_slice.dropna(subset=['X','Y','Z']).reset_index(drop=True)
-    if samp>1: df3 = df3.iloc[::samp].reset_index(drop=True)
+    df_slice = slice_layers(df, *lr)
+    # rows with a full XYZ position, simplified and sampled
+    xyz = df_slice[['X','Y','Z']].to_numpy(); idx = np.flatnonzero(~np.isnan(xyz).any(1))
+    if tol>0: idx = idx[simplify(xyz[idx], tol)]
+    if samp>1: idx = idx[::samp]
+    df3 = df_slice.iloc[idx, df_slice.columns.get_indexer(['Time Step','X','Y','Z','E','Layer','Distance','AvgLayerSpeed'])].reset_index(drop=True)
+    df3 = decimate(df3, budget//10 if anim else budget)
 
-    # color map
-    if vmode=='Layer': color=df3['Layer']
-    elif vmode=='Extrusion Rate': color=df3['E'].diff().fillna(0)
-    elif vmode=='Distance':
-        coords=df3[['X','Y','Z']].to_numpy(); d=np.linalg.norm(np.diff(coords,axis=0),axis=1)
-        color=pd.Series(np.concatenate([[0],d]),index=df3.index)
-    else: color=df3.groupby('Layer')['Time Step'].transform('mean')
-
-    def make_traces(df_part):
-        if gtype=='Line': return [go.Scatter3d(x=df_part['X'],y=df_part['Y'],z=df_part['Z'],mode='lines',line=dict(color=color.loc[df_part.index],colorscale='Viridis',width=6))]
-        if gtype=='Scatter': return [go.Scatter3d(x=df_part['X'],y=df_part['Y'],z=df_part['Z'],mode='markers',marker=dict(color=color.loc[df_part.index],colorscale='Viridis',size=4,opacity=0.6))]
-        u,v,w = np.concatenate([[0],np.diff(df_part['X'])]), np.concatenate([[0],np.diff(df_part['Y'])]), np.concatenate([[0],np.diff(df_part['Z'])])
-        return [go.Streamtube(x=df_part['X'],y=df_part['Y'],z=df_part['Z'],u=u,v=v,w=w,colorscale='Viridis',sizeref=0.5)]
+    fig=build_fig3d(df3,gtype,vmode,show_seams,show_ext,show_ss,anim)
+    if anim: st.download_button('Download Animation (HTML)',fig3d_html(df3,gtype,vmode,show_seams,show_ext,show_ss,anim),file_name='anim.html',mime='text/html')
+    st.plotly_chart(fig,use_container_width=False,width=900,key='fig3d')
 
-    # static or animated
-    if anim:
-        N=120; fd=int(10000/N); frames=[]; total=len(df3)
-        for i,frac in enumerate(np.linspace(1/N,1,N)):
-            cut=int(frac*total); part=df3.iloc[:cut]
-            eye=dict(x=2*np.cos(2*np.pi*frac),y=2*np.sin(2*np.pi*frac),z=1)
-            traces=make_traces(part)
-            # overlays
-            if show_seams:
-                for _,g in part.groupby('Layer'): s0,e0=g.iloc[0],g.iloc[-1]; traces.append(go.Scatter3d(x=[s0.X,e0.X],y=[s0.Y,e0.Y],z=[s0.Z,e0.Z],mode='lines',line=dict(color='white',width=2),showlegend=False))
-            if show_ext:
-                for _,g in part.groupby('Layer'): hi=g.loc[g['Z'].idxmax()]; lo=g.loc[g['Z'].idxmin()]; traces.extend([go.Scatter3d(x=[hi.X],y=[hi.Y],z=[hi.Z],mode='markers',marker=dict(color='yellow',size=4),showlegend=False),go.Scatter3d(x=[lo.X],y=[lo.Y],z=[lo.Z],mode='markers',marker=dict(color='orange',size=4),showlegend=False)])
-            if show_ss and not part.empty:
-                spt,ept=part.iloc[0],part.iloc[-1]; traces.extend([go.Scatter3d(x=[spt.X],y=[spt.Y],z=[spt.Z],mode='markers',marker=dict(color='green',size=6),showlegend=False),go.Scatter3d(x=[ept.X],y=[ept.Y],z=[ept.Z],mode='markers',marker=dict(color='red',size=6),showlegend=False)])
-            frames.append(go.Frame(data=traces,name=f'f{i}',layout=dict(scene_camera=dict(eye=eye))))
-        fig=go.Figure(data=make_traces(df3),frames=frames)
-        fig.update_layout(updatemenus=[dict(type='buttons',showactive=False,buttons=[dict(label='▶️ Play',method='animate',args=[None,dict(frame=dict(duration=fd,redraw=True),transition=dict(duration=0),fromcurrent=True)])])])
-        # download button
-        st.download_button('Download Animation (HTML)',fig.to_html(include_plotlyjs='cdn'),file_name='anim.html',mime='text/html')
-    else:
-        fig=go.Figure(data=make_traces(df3))
-        if show_seams:
-            for _,g in df3.groupby('Layer'): s0,e0=g.iloc[0],g.iloc[-1]; fig.add_trace(go.Scatter3d(x=[s0.X,e0.X],y=[s0.Y,e0.Y],z=[s0.Z,e0.Z],mode='lines',line=dict(color='white',width=2),showlegend=False))
-        if show_ext:
-            for _,g in df3.groupby('Layer'): hi=g.loc[g['Z'].idxmax()]; lo=g.loc[g['Z'].idxmin()]; fig.add_trace(go.Scatter3d(x=[hi.X],y=[hi.Y],z=[hi.Z],mode='markers',marker=dict(color='yellow',size=4),showlegend=False)); fig.add_trace(go.Scatter3d(x=[lo.X],y=[lo.Y],z=[lo.Z],mode='markers',marker=dict(color='orange',size=4),showlegend=False))
-        if show_ss and not df3.empty:
-            spt,ept=df3.iloc[0],df3.iloc[-1]; fig.add_trace(go.Scatter3d(x=[spt.X],y=[spt.Y],z=[spt.Z],mode='markers',marker=dict(color='green',size=6),showlegend=False)); fig.add_trace(go.Scatter3d(x=[ept.X],y=[ept.Y],z=[ept.Z],mode='markers',marker=dict(color='red',size=6),showlegend=False))
-    fig.update_layout(scene=dict(xaxis_title='X (mm)',yaxis_title='Y (mm)',zaxis_title='Z (mm)',aspectmode='data'),template='plotly_dark',height=700,margin=dict(l=0,r=0,b=0,t=0))
-    st.plotly_chart(fig,use_container_width=False,width=900)
-
-# XYZ Over Time
-with st.expander("📈 XYZ Axes Over Time",expanded=True):
-    mxyz=st.selectbox("XYZ Plot Mode:",['Raw','Layer Average'],key='xyzm')
-    axes=st.multiselect("Select XYZ axes:",['X','Y','Z'],default=['X','Y','Z'],key='xyzs')
-    if axes:
-        dfx=df_slice.sort_values('Time Step')
-        fig=px.line(dfx,x='Time Step',y=axes,template='plotly_dark') if mxyz=='Raw' else px.line(df_slice.groupby('Layer')[axes].mean().reset_index(),x='Layer',y=axes,template='plotly_dark')
-        fig.update_layout(height=800)
-        st.plotly_chart(fig,use_container_width=False,width=900)
-
-# ABC Over Time
-with st.expander("📈 ABC Axes Over Time",expanded=True):
-    mabc=st.selectbox("ABC Plot Mode:",['Raw','Layer Average'],key='abcm')
-    axes=st.multiselect("Select ABC axes:",['A','B','C'],default=['A','B','C'],key='abcs')
-    if axes:
-        dfx=df_slice.sort_values('Time Step')
-        fig=px.line(dfx,x='Time Step',y=axes,template='plotly_dark') if mabc=='Raw' else px.line(df_slice.groupby('Layer')[axes].mean().reset_index(),x='Layer',y=axes,template='plotly_dark')
-        fig.update_layout(height=500)
-        st.plotly_chart(fig,use_container_width=False,width=900)
+# XYZ / ABC Over Time
+@st.fragment
+def axes_panel(df_slice, name, opts, height):
+    k=name.lower()
+    with st.expander(f"📈 {name} Axes Over Time",expanded=True):
+        mode=st.selectbox(f"{name} Plot Mode:",['Raw','Layer Average'],key=f'{k}m')
+        axes=st.multiselect(f"Select {name} axes:",opts,default=opts,key=f'{k}s')
+        if axes:
+            st.plotly_chart(axes_fig(df_slice,axes,mode,height),use_container_width=False,width=900,key=f'fig{k}')
+
+axes_panel(df_slice,'XYZ',['X','Y','Z'],800)
+axes_panel(df_slice,'ABC',['A','B','C'],500)
 
 # Data Table & Export
 with st.expander('📄 Data Table & Export',expanded=False):
     st.dataframe(df_slice,use_container_width=True)
-    st.download_button('Download CSV',df_slice.to_csv(index=False).encode(),'motion_data.csv','text/csv')
+    st.download_button('Download CSV',to_csv_bytes(df_slice),'motion_data.csv','text/csv')
+    st.download_button('Download Parquet',to_parquet_bytes(df_slice),'motion_data.parquet','application/octet-stream')